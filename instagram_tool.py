@@ -1,243 +1,824 @@
+from __future__ import annotations
+
 import asyncio
-from typing import Optional, List
-from playwright.async_api import async_playwright, Browser, Page
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import queue
+import signal
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, List, Tuple, AsyncIterator, TYPE_CHECKING
+from urllib.parse import parse_qs, urlencode, urlsplit
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Playwright and dotenv are imported where they are first needed so that
+# constructing the tool (e.g. during Kortix tool registration) stays cheap
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page, Response
+
+logger = logging.getLogger(__name__)
+
+_env_loaded = False
+
+def _load_env():
+    """Load .env into the environment once, on first use"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+@functools.cache
+def _playwright_timeout() -> type:
+    """Playwright's TimeoutError, imported on first use"""
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    return PlaywrightTimeoutError
+
+class TokenBucket:
+    """Async token bucket that spaces out requests to Instagram
+    
+    Holds up to max_tokens and regains one token every refill_interval seconds.
+    Use as ``async with bucket:`` to wait for a token before doing work.
+    """
+    
+    def __init__(self, max_tokens: int = 5, refill_interval: float = 2.0):
+        self.max_tokens = max_tokens
+        self.refill_interval = refill_interval
+        self._tokens = float(max_tokens)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) / self.refill_interval)
+        self._updated = now
+        
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self.refill_interval)
+                self._refill()
+            self._tokens -= 1
+            
+    def drain(self):
+        """Drop all banked tokens, e.g. after Instagram answers with 429"""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+        
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+class CommentCache:
+    """Bounded LRU cache of generated comments keyed on normalized caption and tone
+    
+    Captions never change once posted, so entries are only evicted for size.
+    """
+    
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        
+    @staticmethod
+    def key(caption: str, tone: str) -> str:
+        digest = hashlib.blake2b(caption.strip().lower().encode(), digest_size=16).hexdigest()
+        return f"{digest}|{tone}"
+        
+    def get(self, key: str) -> Optional[str]:
+        comment = self._entries.get(key)
+        if comment is not None:
+            self._entries.move_to_end(key)
+        return comment
+        
+    def put(self, key: str, comment: str):
+        self._entries[key] = comment
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+@dataclass
+class DirectMessageResult:
+    """Outcome of one DM in a batch"""
+    username: str
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class ServiceOverloadError(Exception):
+    """Raised when Instagram signals that it is throttling this session"""
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit that adapts to Instagram throttling, TCP-style
+    
+    Starts at min_concurrency and grows by one slot per success until the first
+    overload (slow start), then by roughly one slot per full window (additive
+    increase). Each ServiceOverloadError halves the limit (multiplicative decrease).
+    The limit only grows while callers actually fill it, and max_concurrency should
+    not exceed whatever else bounds the work (e.g. the context pool).
+    """
+    
+    def __init__(self, max_concurrency: int = 32, min_concurrency: int = 2):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(min_concurrency)
+        self._in_flight = 0
+        self._slow_start = True
+        self._condition = asyncio.Condition()
+        
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            window_full = self._in_flight >= int(self.limit)
+            self._in_flight -= 1
+            if exc_type is not None and issubclass(exc_type, ServiceOverloadError):
+                self._slow_start = False
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            elif exc_type is None and window_full:
+                step = 1 if self._slow_start else 1 / self.limit
+                self.limit = min(self.max_concurrency, self.limit + step)
+            self._condition.notify_all()
+        return False
 
 class InstagramAutomationTool:
     """Instagram automation tool using Playwright for browser automation"""
     
-    def __init__(self):
+    # Selectors used across flows; "a, b" unions let one query cover every variant
+    SEL_USERNAME_INPUT = 'input[name="username"]'
+    SEL_PASSWORD_INPUT = 'input[name="password"]'
+    SEL_LOGIN_BTN = 'button[type="submit"]'
+    SEL_SECURITY_PROMPT_BTN = 'button:has-text("Save Info"), button:has-text("Not Now")'
+    # text-is matches only the element whose own text is exactly the label, never its
+    # wrapper divs (has-text is a substring match that every ancestor satisfies)
+    SEL_NOTIFICATION_NOT_NOW = 'button:has-text("Not Now"), div:text-is("Not Now")'
+    SEL_MESSAGE_BTN = 'button:text-is("Message"), div[role="button"]:text-is("Message")'
+    SEL_DIALOG = 'div[role="dialog"]'
+    SEL_FILE_INPUT = 'input[type="file"]'
+    SEL_MESSAGE_INPUT = 'textarea[placeholder*="Message"], div[role="textbox"], div[contenteditable="true"]'
+    SEL_SEND_BTN = 'button:text-is("Send"), div[role="button"]:text-is("Send")'
+    SEL_POST_LINK = 'a[href*="/p/"]'
+    SEL_FOLLOWERS_LINK = 'a[href$="/followers/"]'
+    SEL_POST_CAPTION = 'h1'
+    SEL_LIKE_BTN = 'svg[aria-label="Like"]'
+    SEL_COMMENT_INPUT = 'textarea[aria-label*="comment"]'
+    SEL_POST_COMMENT_BTN = 'div[role="button"]:has-text("Post"), button:has-text("Post")'
+    
+    # Posts held open at once by interact_with_posts; each window shares one LLM call
+    POST_WINDOW_SIZE = 5
+    
+    # App id the Instagram web client sends with its API calls
+    IG_APP_ID = "936619743392459"
+    
+    # Resource types that are never needed for automation
+    BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+    
+    def __init__(self, storage_state_path: str = ".ig_state.json", pool_size: int = 4):
         self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
         self.playwright = None
         
+        # Session cookies every operation starts from; a saved file is reused if present
+        self.storage_state_path = storage_state_path
+        self.storage_state = storage_state_path if os.path.exists(storage_state_path) else None
+        
+        # Contexts shared by concurrent DM/scrape operations, built lazily from the session
+        self.pool_size = pool_size
+        self._context_pool: Optional[asyncio.Queue[BrowserContext]] = None
+        self._pool_contexts: List[BrowserContext] = []
+        self._stale_contexts: set = set()
+        self._pool_lock = asyncio.Lock()
+        
+        # Rate limit page loads across all contexts to stay under Instagram's abuse checks
+        self._limiter = TokenBucket(max_tokens=5, refill_interval=2.0)
+        
+        self._comment_cache = CommentCache()
+        
     async def init(self):
-        """Initialize browser and page"""
+        """Initialize the browser; contexts and pages are opened per operation"""
+        from playwright.async_api import async_playwright
+        
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(
-            headless=False,
+            headless=True,
+            channel="chromium",  # new headless mode, close to headful behaviour
             args=[
                 '--no-sandbox',
                 '--disable-setuid-sandbox',
                 '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
                 '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu'
+                '--disable-blink-features=AutomationControlled'
             ]
         )
         
-        # Create new context with viewport settings
+    async def _new_context(self, storage_state=None, block_stylesheets: bool = True) -> BrowserContext:
+        """Create a browser context with the tool's viewport and user agent"""
         context = await self.browser.new_context(
+            storage_state=storage_state,
             viewport={'width': 1920, 'height': 1080},
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
         )
+        context.on("response", self._on_response)
+        
+        blocked = self.BLOCKED_RESOURCE_TYPES if block_stylesheets else self.BLOCKED_RESOURCE_TYPES - {"stylesheet"}
+        
+        async def route_request(route):
+            # Abort requests for resources that only matter for rendering
+            if route.request.resource_type in blocked:
+                await route.abort()
+            else:
+                await route.continue_()
+                
+        await context.route("**/*", route_request)
+        return context
+        
+    def _on_response(self, response: Response):
+        """Back off the rate limiter when Instagram reports throttling"""
+        if response.status == 429:
+            self._limiter.drain()
+        
+    async def _ensure_context_pool(self):
+        """Populate the context pool with copies of the current session"""
+        async with self._pool_lock:
+            if self._context_pool is not None:
+                return
+                
+            # Publish the pool only once it is full, so a failed build can be retried
+            pool = asyncio.Queue()
+            try:
+                for _ in range(self.pool_size):
+                    await self._add_pooled_context(pool)
+            except Exception:
+                for context in self._pool_contexts:
+                    await context.close()
+                self._pool_contexts = []
+                raise
+            self._context_pool = pool
+            
+    async def _add_pooled_context(self, pool: asyncio.Queue):
+        """Create a context from the current session and make it available in the pool"""
+        context = await self._new_context(self.storage_state)
+        self._pool_contexts.append(context)
+        pool.put_nowait(context)
+        
+    async def _replace_pooled_context(self, pool: asyncio.Queue, context: BrowserContext):
+        """Swap a pooled context for one built from the current session
+        
+        If the replacement can't be created the old context goes back into the
+        pool, so the pool never loses a slot.
+        """
+        try:
+            await self._add_pooled_context(pool)
+        except Exception as e:
+            logger.warning(f"Could not refresh pooled context, keeping the old one: {e}")
+            self._pool_contexts.append(context)
+            pool.put_nowait(context)
+        else:
+            await context.close()
+        
+    async def _refresh_context_pool(self):
+        """Swap pooled contexts for ones built from the current session
+        
+        Idle contexts are replaced now; borrowed ones are replaced when they are
+        returned, so operations already running keep their context.
+        """
+        async with self._pool_lock:
+            pool = self._context_pool
+            if pool is None:
+                return
+                
+            idle = []
+            while not pool.empty():
+                idle.append(pool.get_nowait())
+            self._stale_contexts.update(context for context in self._pool_contexts if context not in idle)
+            self._pool_contexts = []
+            
+            for context in idle:
+                await self._replace_pooled_context(pool, context)
+            
+    @asynccontextmanager
+    async def _acquire_context(self) -> AsyncIterator[BrowserContext]:
+        """Borrow a pooled context, waiting if all of them are in use"""
+        if not self.browser:
+            raise ValueError("Browser not initialized")
+            
+        await self._ensure_context_pool()
+        pool = self._context_pool
+        context = await pool.get()
+        try:
+            yield context
+        finally:
+            if context not in self._stale_contexts:
+                pool.put_nowait(context)
+            else:
+                # Borrowed across a session refresh; replace it with a current one
+                async with self._pool_lock:
+                    self._stale_contexts.discard(context)
+                    if self._context_pool is pool:
+                        await self._replace_pooled_context(pool, context)
+                    else:
+                        await context.close()
+        
+    async def login_if_needed(self, username: Optional[str] = None, password: Optional[str] = None) -> Optional[dict]:
+        """Log in only if the saved session is missing or expired
         
-        self.page = await context.new_page()
+        Returns the session's storage state, or None if logging in failed.
+        """
+        if self.storage_state is not None:
+            async with self._acquire_context() as context:
+                # Instagram serves the login form at / without redirecting, so judge the
+                # session by its cookie rather than by the URL
+                cookies = await context.cookies("https://www.instagram.com")
+                now = time.time()
+                if any(
+                    cookie["name"] == "sessionid" and cookie["value"]
+                    and (cookie["expires"] == -1 or cookie["expires"] > now)
+                    for cookie in cookies
+                ):
+                    logger.info("Existing session is still valid")
+                    return await context.storage_state()
+                    
+        return await self.login(username, password)
         
-    async def login(self, username: Optional[str] = None, password: Optional[str] = None):
-        """Log in to Instagram using credentials or cookies"""
-        if not self.page:
-            raise ValueError("Page not initialized")
+    async def login(self, username: Optional[str] = None, password: Optional[str] = None) -> Optional[dict]:
+        """Log in to Instagram using credentials
+        
+        Runs in a throwaway context and returns the resulting storage state (also
+        saved to storage_state_path and used for every later operation), or None
+        if logging in failed.
+        """
+        if not self.browser:
+            raise ValueError("Browser not initialized")
             
         # Use environment variables if credentials not provided
+        _load_env()
         username = username or os.getenv('IG_USERNAME')
         password = password or os.getenv('IG_PASSWORD')
         
         if not username or not password:
             raise ValueError("Instagram credentials not provided")
             
+        # Keep stylesheets so layout shifts don't break the form selectors
+        context = await self._new_context(block_stylesheets=False)
         try:
-            await self.page.goto("https://www.instagram.com/accounts/login/", wait_until="networkidle")
-            await asyncio.sleep(3)
+            page = await context.new_page()
+            await page.goto("https://www.instagram.com/accounts/login/", wait_until="domcontentloaded")
             
             # Fill login form
-            username_input = await self.page.query_selector('input[name="username"]')
-            password_input = await self.page.query_selector('input[name="password"]')
+            username_input = await self._safe_ready(page, self.SEL_USERNAME_INPUT, timeout=10000)
+            password_input = await page.query_selector(self.SEL_PASSWORD_INPUT)
             
             if username_input and password_input:
                 await username_input.fill(username)
                 await password_input.fill(password)
-                await asyncio.sleep(1)
                 
                 # Click login button
-                login_button = await self.page.query_selector('button[type="submit"]')
+                login_button = await page.query_selector(self.SEL_LOGIN_BTN)
                 if login_button:
                     await login_button.click()
-                    await asyncio.sleep(5)
+                    
+                    # Wait for the redirect away from the login form rather than for
+                    # network idle, which Instagram's background requests delay
+                    await page.wait_for_url(lambda url: "/accounts/login" not in url, timeout=15000)
                     
                     # Handle potential security checks
-                    await self._handle_security_checks()
+                    await self._handle_security_checks(page)
+                    
+                    # Persist session cookies so later runs can skip the login flow
+                    self.storage_state = await context.storage_state()
+                    self._save_storage_state(self.storage_state)
+                    await self._refresh_context_pool()
                     
-                    print("Login successful")
-                    return True
+                    logger.info("Login successful")
+                    return self.storage_state
             
-            print("Login form elements not found")
-            return False
+            logger.warning("Login form elements not found")
+            return None
             
         except Exception as e:
-            print(f"Login failed: {e}")
-            return False
+            logger.error(f"Login failed: {e}")
+            return None
+            
+        finally:
+            await context.close()
+            
+    def _save_storage_state(self, state: dict):
+        """Write session cookies to storage_state_path, readable by the owner only"""
+        fd = os.open(self.storage_state_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            # O_CREAT's mode doesn't apply to a file that already exists
+            os.chmod(self.storage_state_path, 0o600)
+            json.dump(state, f)
             
-    async def _handle_security_checks(self):
+    async def _safe_ready(self, page: Page, selector: str, timeout: int = 8000):
+        """Wait until the page is parsed and selector is present
+        
+        No network-idle wait: Instagram's background requests never let the network
+        go quiet, so the selector is the only reliable readiness signal.
+        """
+        await page.wait_for_load_state("domcontentloaded")
+        return await page.wait_for_selector(selector, timeout=timeout)
+        
+    async def _handle_security_checks(self, page: Page):
         """Handle Instagram security checks and popups"""
-        if not self.page:
-            return
+        # Dismiss whichever of the "Save Login Info" / notification prompts shows up
+        with contextlib.suppress(_playwright_timeout()):
+            await page.locator(self.SEL_SECURITY_PROMPT_BTN).first.click(timeout=2000)
             
+    async def _handle_notification_popup(self, page: Page):
+        """Handle Instagram notification popup"""
         try:
-            # Check for "Save Login Info" prompt
-            save_info_button = await self.page.query_selector('button:has-text("Save Info")')
-            if save_info_button:
-                await save_info_button.click()
-                await asyncio.sleep(2)
-                
-            # Check for notification popup
-            not_now_button = await self.page.query_selector('button:has-text("Not Now")')
-            if not_now_button:
+            not_now_button = page.locator(self.SEL_NOTIFICATION_NOT_NOW).first
+            if await not_now_button.count():
                 await not_now_button.click()
-                await asyncio.sleep(2)
+                with contextlib.suppress(_playwright_timeout()):
+                    await page.locator(self.SEL_DIALOG).first.wait_for(state="hidden", timeout=3000)
+                logger.info("Notification popup dismissed")
+                return
                 
-        except Exception as e:
-            print(f"Security check handling failed: {e}")
-            
-    async def _handle_notification_popup(self):
-        """Handle Instagram notification popup"""
-        if not self.page:
-            return
-            
-        try:
-            not_now_selectors = [
-                'button:has-text("Not Now")',
-                'div:has-text("Not Now")',
-                '//button[contains(text(), "Not Now")]',
-                '//div[contains(text(), "Not Now")]'
-            ]
-            
-            for selector in not_now_selectors:
-                not_now_button = await self.page.query_selector(selector)
-                if not_now_button:
-                    await not_now_button.click()
-                    await asyncio.sleep(1.5)
-                    print("Notification popup dismissed")
-                    return
-                    
-            print("'Not Now' button not found in notification dialog")
+            logger.info("'Not Now' button not found in notification dialog")
             
         except Exception as e:
-            print(f"No notification popup appeared: {e}")
+            logger.info(f"No notification popup appeared: {e}")
             
     async def send_direct_message(self, username: str, message: str, media_path: Optional[str] = None):
-        """Send a direct message to a user"""
-        if not self.page:
-            raise ValueError("Page not initialized")
+        """Send a direct message to a user
+        
+        Safe to call concurrently; each call runs in its own page on a pooled context.
+        """
+        async with self._acquire_context() as context:
+            page = await context.new_page()
+            try:
+                async with self._limiter:
+                    await self._send_direct_message(page, username, message, media_path)
+            finally:
+                await page.close()
+                
+    async def send_direct_messages(self, items: List[Tuple[str, str]]) -> List[DirectMessageResult]:
+        """Send a batch of (username, message) DMs concurrently
+        
+        A failed DM is recorded in its result instead of cancelling the rest of the
+        batch; results are returned in the same order as items.
+        """
+        async def send_one(username: str, message: str) -> DirectMessageResult:
+            try:
+                await self.send_direct_message(username, message)
+                return DirectMessageResult(username)
+            except Exception as e:
+                return DirectMessageResult(username, e)
+                
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(send_one(username, message)) for username, message in items]
             
+        return [task.result() for task in tasks]
+        
+    async def _send_direct_message(self, page: Page, username: str, message: str, media_path: Optional[str]):
+        """Run the DM flow on the given page"""
         try:
-            await self.page.goto(f"https://www.instagram.com/{username}/", wait_until="networkidle")
-            await asyncio.sleep(3)
+            response = await page.goto(f"https://www.instagram.com/{username}/", wait_until="domcontentloaded")
+            if response and response.status == 429:
+                raise ServiceOverloadError("Instagram responded with HTTP 429")
             
             # Find and click message button
-            message_button = await self.page.query_selector('button:has-text("Message"), div:has-text("Message")')
-            if not message_button:
-                raise ValueError("Message button not found")
+            try:
+                message_button = await self._safe_ready(page, self.SEL_MESSAGE_BTN, timeout=10000)
+            except _playwright_timeout() as e:
+                if await page.get_by_text("Please wait a few minutes").count():
+                    raise ServiceOverloadError("Instagram asked to wait a few minutes") from e
+                raise ValueError("Message button not found") from e
                 
             await message_button.click()
-            await asyncio.sleep(2)
-            await self._handle_notification_popup()
+            await page.wait_for_url("**/direct/**", timeout=10000)
+            
+            # The thread renders either the composer or a notification prompt first
+            with contextlib.suppress(_playwright_timeout()):
+                await page.locator(f"{self.SEL_MESSAGE_INPUT}, {self.SEL_NOTIFICATION_NOT_NOW}").first.wait_for(timeout=5000)
+            await self._handle_notification_popup(page)
             
             # Handle media attachment if provided
             if media_path:
-                file_input = await self.page.query_selector('input[type="file"]')
+                file_input = await page.query_selector(self.SEL_FILE_INPUT)
                 if file_input:
                     await file_input.set_input_files(media_path)
-                    await asyncio.sleep(2)
                 else:
-                    print("File input not found for media attachment")
+                    logger.warning("File input not found for media attachment")
                     
             # Find message input and send
-            message_input_selectors = [
-                'textarea[placeholder*="Message"]',
-                'div[role="textbox"]',
-                'div[contenteditable="true"]'
-            ]
-            
-            message_input = None
-            for selector in message_input_selectors:
-                message_input = await self.page.query_selector(selector)
-                if message_input:
-                    break
-                    
-            if not message_input:
-                raise ValueError("Message input not found")
+            message_input = page.locator(self.SEL_MESSAGE_INPUT).first
+            try:
+                await message_input.wait_for(state="visible", timeout=5000)
+            except _playwright_timeout() as e:
+                raise ValueError("Message input not found") from e
                 
             await message_input.fill(message)
-            await asyncio.sleep(2)
             
             # Find and click send button
-            send_button = await self.page.query_selector('button:has-text("Send"), div:has-text("Send")')
-            if send_button:
-                await send_button.click()
-                print("Message sent successfully")
-            else:
-                raise ValueError("Send button not found")
+            try:
+                await page.locator(self.SEL_SEND_BTN).first.click(timeout=5000)
+            except _playwright_timeout() as e:
+                raise ValueError("Send button not found") from e
+            logger.info(f"Message sent successfully to {username}")
                 
         except Exception as e:
-            print(f"Failed to send DM to {username}: {e}")
+            logger.error(f"Failed to send DM to {username}: {e}")
             raise
             
-    async def interact_with_posts(self, max_posts: int = 20):
-        """Like posts and generate AI-powered comments"""
-        if not self.page:
-            raise ValueError("Page not initialized")
-            
-        # TODO: Implement post interaction logic
-        # This will include:
-        # - Scrolling through posts
-        # - Liking posts
-        # - Generating AI comments using Kortix LLM
-        # - Posting comments
+    async def interact_with_posts(self, max_posts: int = 20, target_account: Optional[str] = None, tone: Optional[str] = None) -> int:
+        """Like posts and generate AI-powered comments
         
-        print(f"Post interaction for {max_posts} posts not yet implemented")
+        Posts are handled in windows of POST_WINDOW_SIZE: each post in a window is
+        loaded once and kept open while its caption is read, then the window's
+        comments come from one batched LLM call. Returns the number of posts
+        interacted with.
+        """
+        max_posts = int(max_posts)  # tool callers may pass JSON numbers such as 20.0
+        async with self._acquire_context() as context:
+            listing_page = await context.new_page()
+            try:
+                url = f"https://www.instagram.com/{target_account}/" if target_account else "https://www.instagram.com/"
+                async with self._limiter:
+                    await listing_page.goto(url, wait_until="domcontentloaded")
+                post_urls = await self._collect_post_urls(listing_page, max_posts)
+            finally:
+                await listing_page.close()
+                
+            interacted = 0
+            for start in range(0, len(post_urls), self.POST_WINDOW_SIZE):
+                window = post_urls[start:start + self.POST_WINDOW_SIZE]
+                pages: List[Page] = []
+                try:
+                    captions = []
+                    for post_url in window:
+                        page = await context.new_page()
+                        pages.append(page)
+                        async with self._limiter:
+                            await page.goto(post_url, wait_until="domcontentloaded")
+                        captions.append(await self._read_caption(page))
+                        
+                    # A blank caption gives the LLM nothing to respond to, so leave those posts alone
+                    targets = []
+                    for page, post_url, caption in zip(pages, window, captions):
+                        if caption.strip():
+                            targets.append((page, post_url, caption))
+                        else:
+                            logger.info(f"Skipping {post_url}: no caption to comment on")
+                    if not targets:
+                        continue
+                        
+                    comments = await self.generate_comments_batch([caption for _, _, caption in targets], tone)
+                    
+                    for (page, post_url, _), comment in zip(targets, comments):
+                        try:
+                            await self._like_and_comment(page, comment)
+                            interacted += 1
+                        except Exception as e:
+                            logger.error(f"Failed to interact with {post_url}: {e}")
+                            
+                finally:
+                    for page in pages:
+                        await page.close()
+                        
+            return interacted
+                
+    async def _collect_post_urls(self, page: Page, max_posts: int, max_scrolls: int = 10) -> List[str]:
+        """Scroll the feed or profile grid until enough post links are loaded"""
+        await page.wait_for_selector(self.SEL_POST_LINK, timeout=10000)
+        
+        post_links = page.locator(self.SEL_POST_LINK)
+        urls: List[str] = []
+        for _ in range(max_scrolls):
+            urls = await post_links.evaluate_all("links => [...new Set(links.map(a => a.href))]")
+            if len(urls) >= max_posts:
+                break
+                
+            await page.mouse.wheel(0, 4000)
+            try:
+                await page.wait_for_function(
+                    "([selector, count]) => document.querySelectorAll(selector).length > count",
+                    arg=[self.SEL_POST_LINK, await post_links.count()],
+                    timeout=5000
+                )
+            except _playwright_timeout():
+                break
+                
+        return urls[:max_posts]
+        
+    async def _read_caption(self, page: Page) -> str:
+        """Return the caption of an open post, or an empty string if it has none"""
+        try:
+            return await page.locator(self.SEL_POST_CAPTION).first.inner_text(timeout=5000)
+        except _playwright_timeout():
+            return ""
+            
+    async def _like_and_comment(self, page: Page, comment: str):
+        """Like an open post and leave the given comment"""
+        await page.locator(self.SEL_LIKE_BTN).first.click(timeout=5000)
+        await page.locator(self.SEL_COMMENT_INPUT).first.fill(comment, timeout=5000)
+        await page.locator(self.SEL_POST_COMMENT_BTN).first.click(timeout=5000)
         
     async def scrape_followers(self, target_account: str, max_followers: int) -> List[str]:
-        """Scrape followers from a target account"""
-        if not self.page:
-            raise ValueError("Page not initialized")
+        """Scrape followers from a target account
+        
+        Opens the followers dialog once to capture Instagram's GraphQL request, then
+        pages through the JSON endpoint directly instead of scrolling the dialog.
+        """
+        max_followers = int(max_followers)  # a float would break slicing and the GraphQL "first" variable
+        async with self._acquire_context() as context:
+            # Check the profile over the API first so private or empty accounts never load a page
+            profile = await self._get_profile_info(context, target_account)
+            if profile.get("is_private") and not profile.get("followed_by_viewer"):
+                raise ValueError(f"{target_account} is private")
+            if not profile["edge_followed_by"]["count"]:
+                return []
+                
+            user_id = str(profile["id"])
+            
+            page = await context.new_page()
+            try:
+                async with self._limiter:
+                    await page.goto(f"https://www.instagram.com/{target_account}/", wait_until="domcontentloaded")
+                    
+                # The profile fires other GraphQL queries (highlights, suggestions); only
+                # accept the one paging this account's followers
+                async with page.expect_response(lambda r: self._is_followers_query(r.url, user_id), timeout=15000) as response_info:
+                    await page.locator(self.SEL_FOLLOWERS_LINK).first.click(timeout=10000)
+                response = await response_info.value
+                request = response.request
+                data = await response.json()
+            finally:
+                await page.close()
+                
+            query = parse_qs(urlsplit(request.url).query)
+            query_hash = query["query_hash"][0]
+            variables = json.loads(query["variables"][0])
+            
+            followers: List[str] = []
+            while True:
+                edge_followed_by = self._parse_followers_page(data)
+                followers.extend(edge["node"]["username"] for edge in edge_followed_by["edges"])
+                page_info = edge_followed_by["page_info"]
+                if len(followers) >= max_followers or not page_info["has_next_page"]:
+                    break
+                    
+                # Reissue the captured request with the next cursor; the context supplies cookies
+                variables.update(after=page_info["end_cursor"], first=min(50, max_followers - len(followers)))
+                url = "https://www.instagram.com/graphql/query/?" + urlencode({
+                    "query_hash": query_hash,
+                    "variables": json.dumps(variables, separators=(",", ":"))
+                })
+                data = await self._api_get(context, url, headers=request.headers)
+                
+            return followers[:max_followers]
+            
+    @staticmethod
+    def _is_followers_query(url: str, user_id: str) -> bool:
+        """Whether url is a GraphQL query whose variables target the given user id"""
+        if "graphql/query" not in url:
+            return False
+            
+        query = parse_qs(urlsplit(url).query)
+        if "query_hash" not in query or "variables" not in query:
+            return False
+        try:
+            variables = json.loads(query["variables"][0])
+        except ValueError:
+            return False
+        return isinstance(variables, dict) and str(variables.get("id")) == user_id
+        
+    @staticmethod
+    def _parse_followers_page(data: dict) -> dict:
+        """Return the edge_followed_by block of a followers response, validating its shape"""
+        try:
+            edge_followed_by = data["data"]["user"]["edge_followed_by"]
+        except (KeyError, TypeError):
+            edge_followed_by = None
+        if not isinstance(edge_followed_by, dict) or not {"edges", "page_info"} <= edge_followed_by.keys():
+            raise ValueError("Unexpected followers response from Instagram")
+        return edge_followed_by
+        
+    async def get_profile_info(self, username: str) -> dict:
+        """Fetch profile metadata (id, follower counts, privacy) without loading the profile page"""
+        async with self._acquire_context() as context:
+            return await self._get_profile_info(context, username)
             
-        # TODO: Implement follower scraping logic
-        print(f"Follower scraping for {target_account} not yet implemented")
-        return []
+    async def _get_profile_info(self, context: BrowserContext, username: str) -> dict:
+        """Fetch profile metadata using the given context"""
+        data = await self._api_get(
+            context,
+            "https://www.instagram.com/api/v1/users/web_profile_info/?" + urlencode({"username": username})
+        )
+        return data["data"]["user"]
+        
+    async def _api_get(self, context: BrowserContext, url: str, headers: Optional[dict] = None) -> dict:
+        """GET a JSON endpoint over the context's pooled HTTP connection, sharing its cookies"""
+        headers = {**(headers or {}), "x-ig-app-id": self.IG_APP_ID}
+        async with self._limiter:
+            response = await context.request.get(url, headers=headers)
+        if response.status == 429:
+            self._limiter.drain()
+            raise ServiceOverloadError("Instagram responded with HTTP 429")
+        if not response.ok:
+            raise ValueError(f"Instagram API request failed with HTTP {response.status}")
+        return await response.json()
         
     async def close(self):
         """Clean up browser resources"""
         if self.browser:
             await self.browser.close()
             self.browser = None
-            self.page = None
+            self._context_pool = None
+            self._pool_contexts = []
+            self._stale_contexts = set()
             
     # AI Integration Methods (to be implemented with Kortix LLM)
-    async def generate_comment(self, post_caption: str) -> str:
+    async def generate_comment(self, post_caption: str, tone: Optional[str] = None) -> str:
         """Generate AI-powered comment using Kortix LLM"""
+        comments = await self.generate_comments_batch([post_caption], tone)
+        return comments[0]
+        
+    async def generate_comments_batch(self, captions: List[str], tone: Optional[str] = None) -> List[str]:
+        """Generate one comment per caption, sending only uncached captions to the LLM in one call"""
+        # Blank captions would all share one key, so they are never cached
+        keys = [CommentCache.key(caption, tone or "auto") if caption.strip() else None for caption in captions]
+        comments = [self._comment_cache.get(key) if key else None for key in keys]
+        
+        # Deduplicate misses so repeated captions in a batch are generated once
+        pending = {}
+        for index, (key, caption, comment) in enumerate(zip(keys, captions, comments)):
+            if comment is None:
+                pending.setdefault(key or index, caption)
+                
+        if pending:
+            generated = dict(zip(pending, await self._complete_comments(list(pending.values()), tone)))
+            for key, comment in generated.items():
+                if isinstance(key, str):
+                    self._comment_cache.put(key, comment)
+            comments = [
+                comment if comment is not None else generated[key or index]
+                for index, (key, comment) in enumerate(zip(keys, comments))
+            ]
+            
+        return comments
+        
+    async def _complete_comments(self, captions: List[str], tone: Optional[str]) -> List[str]:
+        """Issue a single LLM request returning a JSON array with one comment per caption"""
         # TODO: Integrate with Kortix's LLM system
         # This replaces Riona's Google Gemini integration
         
-        prompt = f"""Generate a human-like Instagram comment based on this post: "{post_caption}".
+        tone_requirement = f"Use a {tone} tone" if tone else "Match the tone of each caption (casual, funny, serious, or sarcastic)"
+        numbered_captions = "\n".join(f'{i}. "{caption}"' for i, caption in enumerate(captions, 1))
+        prompt = f"""Generate a human-like Instagram comment for each of these posts:
+        {numbered_captions}
         
         Requirements:
-        - Match the tone of the caption (casual, funny, serious, or sarcastic)
+        - {tone_requirement}
         - Sound organic—avoid robotic phrasing or overly perfect grammar
         - Use relatable language with light slang and emojis if appropriate
-        - Keep it concise (1-2 sentences max)
+        - Keep each comment concise (1-2 sentences max)
         - Avoid generic praise; react specifically to the content
+        - Respond with only a JSON array of {len(captions)} strings, in the same order as the posts
         """
         
         # Placeholder - will be replaced with Kortix LLM call
-        return "Great post! 😊👏"
+        response = json.dumps(["Great post! 😊👏"] * len(captions))
+        
+        comments = json.loads(response)
+        if not isinstance(comments, list) or len(comments) != len(captions):
+            raise ValueError(f"Expected {len(captions)} comments from LLM, got {response!r}")
+        return [str(comment) for comment in comments]
         
+def _configure_logging() -> QueueListener:
+    """Send log records through a queue so emitting them never blocks on stdout"""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+    
 async def main():
     """Example usage"""
+    listener = _configure_logging()
     tool = InstagramAutomationTool()
     
     try:
@@ -246,14 +827,21 @@ async def main():
         # Example: Send a test message
         # await tool.send_direct_message("test_user", "Hello from Kortix!")
         
-        # Keep browser open for testing
-        print("Browser initialized successfully. Press Ctrl+C to exit.")
-        await asyncio.sleep(3600)  # Keep open for 1 hour
+        # Keep browser open for testing until Ctrl+C (or docker stop)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):  # not available on Windows
+                loop.add_signal_handler(sig, stop.set)
+                
+        logger.info("Browser initialized successfully. Press Ctrl+C to exit.")
+        await stop.wait()
         
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error(f"Error: {e}")
     finally:
         await tool.close()
+        listener.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
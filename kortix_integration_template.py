@@ -21,6 +21,14 @@ class InstagramAutomationTool(SandboxToolsBase):
     - Session management with cookie persistence
     """
     
+    # One logged-in browser per process, reused by every tool instance
+    _shared_client = None
+    _shared_client_lock = asyncio.Lock()
+    
+    # Shared across tool instances so concurrent DM calls adapt to the same throttling signal
+    _dm_concurrency = None
+    _comment_cache = None
+    
     def __init__(self, project_id: str, thread_id: str, thread_manager: ThreadManager):
         super().__init__(project_id, thread_manager)
         self.thread_id = thread_id
@@ -29,10 +37,50 @@ class InstagramAutomationTool(SandboxToolsBase):
     async def _ensure_instagram_client(self):
         """Ensure Instagram client is initialized"""
         if not self.instagram_client:
-            # Import here to avoid circular imports
-            from instagram_tool import InstagramAutomationTool as Client
-            self.instagram_client = Client()
-            await self.instagram_client.init()
+            async with InstagramAutomationTool._shared_client_lock:
+                if InstagramAutomationTool._shared_client is None:
+                    # Import here to avoid circular imports
+                    from instagram_tool import InstagramAutomationTool as Client
+                    client = Client()
+                    try:
+                        await client.init()
+                        if not await client.login_if_needed():
+                            raise RuntimeError("Instagram login failed")
+                    except Exception:
+                        # Don't leak the browser or share a client without a session
+                        await client.close()
+                        raise
+                    InstagramAutomationTool._shared_client = client
+            self.instagram_client = InstagramAutomationTool._shared_client
+            
+    async def _send_direct_message_adaptive(self, username: str, message: str, media_path: Optional[str], max_attempts: int = 3):
+        """Send a DM under the shared adaptive concurrency limit, retrying when throttled"""
+        from instagram_tool import AdaptiveConcurrencyLimiter, ServiceOverloadError, _playwright_timeout
+        
+        if InstagramAutomationTool._dm_concurrency is None:
+            # More concurrent sends than pooled contexts would only queue for a context
+            pool_size = self.instagram_client.pool_size
+            InstagramAutomationTool._dm_concurrency = AdaptiveConcurrencyLimiter(
+                max_concurrency=min(32, pool_size),
+                min_concurrency=min(2, pool_size)
+            )
+        limiter = InstagramAutomationTool._dm_concurrency
+        
+        for attempt in range(1, max_attempts + 1):
+            try:
+                async with limiter:
+                    try:
+                        await self.instagram_client.send_direct_message(username, message, media_path)
+                    except _playwright_timeout() as e:
+                        # Only bare navigation timeouts signal load; "not found" ValueErrors are
+                        # the normal outcome for missing, private or DM-closed accounts
+                        raise ServiceOverloadError(str(e)) from e
+                return
+            except ServiceOverloadError as e:
+                if attempt == max_attempts:
+                    raise
+                logger.warning(f"Instagram throttled DM to {username} (attempt {attempt}): {e}")
+                await asyncio.sleep(2 ** attempt)
             
     @openapi_schema({
         "type": "function",
@@ -79,7 +127,7 @@ class InstagramAutomationTool(SandboxToolsBase):
         """Send a direct message to an Instagram user"""
         try:
             await self._ensure_instagram_client()
-            await self.instagram_client.send_direct_message(username, message, media_path)
+            await self._send_direct_message_adaptive(username, message, media_path)
             
             return self.success_response({
                 "message": f"Message sent successfully to {username}",
@@ -101,7 +149,7 @@ class InstagramAutomationTool(SandboxToolsBase):
                 "type": "object",
                 "properties": {
                     "max_posts": {
-                        "type": "number",
+                        "type": "integer",
                         "description": "Maximum number of posts to interact with",
                         "default": 20
                     },
@@ -125,18 +173,12 @@ class InstagramAutomationTool(SandboxToolsBase):
         """Like posts and generate AI-powered comments"""
         try:
             await self._ensure_instagram_client()
-            
-            if target_account:
-                # Navigate to specific account first
-                await self.instagram_client.page.goto(f"https://www.instagram.com/{target_account}/")
-                await asyncio.sleep(3)
-                
-            await self.instagram_client.interact_with_posts(max_posts)
+            posts_processed = await self.instagram_client.interact_with_posts(int(max_posts), target_account)
             
             return self.success_response({
-                "message": f"Interacted with {max_posts} posts successfully",
+                "message": f"Interacted with {posts_processed} posts successfully",
                 "target_account": target_account,
-                "posts_processed": max_posts
+                "posts_processed": posts_processed
             })
             
         except Exception as e:
@@ -156,7 +198,7 @@ class InstagramAutomationTool(SandboxToolsBase):
                         "description": "Instagram username to scrape followers from"
                     },
                     "max_followers": {
-                        "type": "number",
+                        "type": "integer",
                         "description": "Maximum number of followers to scrape",
                         "default": 100
                     }
@@ -176,6 +218,7 @@ class InstagramAutomationTool(SandboxToolsBase):
     async def instagram_scrape_followers(self, target_account: str, max_followers: int = 100) -> ToolResult:
         """Scrape followers from a target Instagram account"""
         try:
+            max_followers = int(max_followers)
             await self._ensure_instagram_client()
             followers = await self.instagram_client.scrape_followers(target_account, max_followers)
             
@@ -228,21 +271,20 @@ class InstagramAutomationTool(SandboxToolsBase):
     async def instagram_generate_comment(self, post_caption: str, tone: str = "casual") -> ToolResult:
         """Generate AI-powered comment using Kortix LLM"""
         try:
-            # TODO: Integrate with Kortix's LLM system
-            # This would replace the placeholder implementation
-            
-            prompt = f"""Generate a human-like Instagram comment based on this post: "{post_caption}".
+            from instagram_tool import CommentCache
             
-            Tone: {tone}
-            Requirements:
-            - Sound organic and authentic
-            - Use appropriate emojis and casual language
-            - 1-2 sentences maximum
-            - React specifically to the post content
-            """
+            if not post_caption.strip():
+                return self.fail_response("Post caption is empty; nothing to comment on")
+                
+            if InstagramAutomationTool._comment_cache is None:
+                InstagramAutomationTool._comment_cache = CommentCache()
+            cache = InstagramAutomationTool._comment_cache
+            cache_key = CommentCache.key(post_caption, tone)
             
-            # Placeholder - will be replaced with Kortix LLM integration
-            comment = "This looks amazing! Can't wait to try it out 🚀👏"
+            comment = cache.get(cache_key)
+            if comment is None:
+                comment = await self._generate_comment(post_caption, tone)
+                cache.put(cache_key, comment)
             
             return self.success_response({
                 "message": "Comment generated successfully",
@@ -255,8 +297,33 @@ class InstagramAutomationTool(SandboxToolsBase):
             logger.error(f"Failed to generate comment: {e}")
             return self.fail_response(f"Failed to generate comment: {str(e)}")
             
+    async def _generate_comment(self, post_caption: str, tone: str) -> str:
+        """Ask the LLM for a single comment"""
+        # TODO: Integrate with Kortix's LLM system
+        # This would replace the placeholder implementation
+        
+        prompt = f"""Generate a human-like Instagram comment based on this post: "{post_caption}".
+        
+        Tone: {tone}
+        Requirements:
+        - Sound organic and authentic
+        - Use appropriate emojis and casual language
+        - 1-2 sentences maximum
+        - React specifically to the post content
+        """
+        
+        # Placeholder - will be replaced with Kortix LLM integration
+        return "This looks amazing! Can't wait to try it out 🚀👏"
+        
     async def close(self):
         """Clean up resources"""
-        if self.instagram_client:
-            await self.instagram_client.close()
-            self.instagram_client = None
\ No newline at end of file
+        # The browser is shared with other tool instances; only drop our reference
+        self.instagram_client = None
+        
+    @classmethod
+    async def close_shared_client(cls):
+        """Shut down the process-wide browser, e.g. on worker shutdown"""
+        async with cls._shared_client_lock:
+            if cls._shared_client:
+                await cls._shared_client.close()
+                cls._shared_client = None
\ No newline at end of file